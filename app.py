@@ -8,13 +8,24 @@ from flask import Flask, request, jsonify, send_from_directory, send_file
 from flask_cors import CORS
 import oracledb
 import os
+import re
+import shutil
+import hashlib
+import time
+from contextlib import contextmanager
 from datetime import datetime
 import logging
 import json
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.worksheet.datavalidation import DataValidation
 from io import BytesIO
 
+try:
+    import fcntl
+except ImportError:  # Windows development machines (start.ps1)
+    fcntl = None
+
 app = Flask(__name__, static_folder='static')
 CORS(app)
 
@@ -72,6 +83,352 @@ def get_db_connection():
         raise
 
 
+# Shared cache of the newest records served by /api/records.
+# Kept in a file so every gunicorn worker sees the same buffer; each worker
+# only re-reads it when the file changes.
+CACHE_DIR = 'cache'
+RECENT_RECORDS_FILE = os.path.join(CACHE_DIR, 'recent_records.jsonl')
+RECENT_RECORDS_LOCK_FILE = os.path.join(CACHE_DIR, 'recent_records.lock')
+RECENT_RECORDS_SIZE = 50
+RECENT_RECORDS_MAX_AGE = 300  # seconds before the buffer is re-seeded from Oracle
+
+RECENT_RECORDS_QUERY = """
+    SELECT ID, ZONE, FIELD_OFFICER, BTSID, MSISDN, 
+           TO_CHAR(ENTRY_DATE, 'YYYY-MM-DD') as ENTRY_DATE,
+           NEW_SIM, REPLACE_SIM, NEW_RETAILER_COUNT, 
+           TO_CHAR(CREATED_DATE, 'YYYY-MM-DD HH24:MI:SS') as CREATED_DATE
+    FROM Mela_SIM_sell_crm_cnl_T 
+    ORDER BY CREATED_DATE DESC 
+    FETCH FIRST :limit ROWS ONLY
+"""
+
+# Appended to the insert statements so the cache can be updated without a re-query
+INSERT_RETURNING_CLAUSE = """
+    RETURNING ID, ENTRY_DATE, CREATED_DATE INTO :new_id, :new_entry_date, :new_created_date
+"""
+
+PROCESS_STARTED_AT = time.time()
+
+os.makedirs(CACHE_DIR, exist_ok=True)
+
+# Per-worker copy of the shared buffer: write nonce, seed time, serialized records (newest first)
+_recent_records = {'nonce': None, 'seeded_at': 0.0, 'items': []}
+
+
+@contextmanager
+def recent_records_lock():
+    """Serialize writers of the shared recent-records buffer across workers"""
+    with open(RECENT_RECORDS_LOCK_FILE, 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def serialize_record(record):
+    """Serialize a record once so cached reads only have to join strings"""
+    return json.dumps(record, sort_keys=True, ensure_ascii=False)
+
+
+def read_recent_records():
+    """Return (seeded_at, items) from the shared buffer, or None if it is missing or unreadable"""
+    try:
+        with open(RECENT_RECORDS_FILE, 'r', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            # Every write stores a fresh nonce; the records are only re-read when it changes
+            if header['nonce'] != _recent_records['nonce']:
+                _recent_records['items'] = f.read().splitlines()
+                _recent_records['nonce'] = header['nonce']
+                _recent_records['seeded_at'] = header['seeded_at']
+    except FileNotFoundError:
+        return None
+    except (ValueError, KeyError, TypeError) as e:
+        # Empty or truncated file (e.g. after a crash); treat it as missing so it is re-seeded
+        logger.warning(f"Recent records cache is unreadable, re-seeding: {e}")
+        _recent_records['nonce'] = None
+        return None
+
+    return _recent_records['seeded_at'], _recent_records['items']
+
+
+def write_recent_records(seeded_at, items):
+    """Atomically replace the shared buffer (caller must hold recent_records_lock)"""
+    tmp_file = f"{RECENT_RECORDS_FILE}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'seeded_at': seeded_at, 'nonce': os.urandom(8).hex()}) + '\n')
+        for item in items[:RECENT_RECORDS_SIZE]:
+            f.write(item + '\n')
+    os.replace(tmp_file, RECENT_RECORDS_FILE)
+
+
+def seed_recent_records(cursor):
+    """Re-seed the shared buffer with the newest records from Oracle"""
+    with recent_records_lock():
+        # Another worker may have re-seeded while this one waited for the lock
+        items = cached_recent_records()
+        if items is not None:
+            return items
+
+        cursor.execute(RECENT_RECORDS_QUERY, {'limit': RECENT_RECORDS_SIZE})
+        columns = [col[0] for col in cursor.description]
+        items = [serialize_record(dict(zip(columns, row))) for row in cursor.fetchall()]
+        write_recent_records(time.time(), items)
+
+    logger.info(f"Recent records cache seeded with {len(items)} records")
+    return items
+
+
+def push_recent_records(records):
+    """Add newly committed records (oldest first) to the front of the shared buffer"""
+    try:
+        with recent_records_lock():
+            cached = read_recent_records()
+            if cached is None:
+                # Nothing to update; the next read seeds from Oracle
+                return
+
+            seeded_at, items = cached
+            new_ids = {record['ID'] for record in records}
+            items = [item for item in items if json.loads(item)['ID'] not in new_ids]
+            new_items = [serialize_record(record) for record in reversed(records)]
+            write_recent_records(seeded_at, new_items + items)
+    except Exception as e:
+        logger.warning(f"Could not update recent records cache, invalidating it: {e}")
+        invalidate_recent_records()
+
+
+def invalidate_recent_records():
+    """Drop the shared buffer so the next read re-seeds it from Oracle"""
+    try:
+        os.remove(RECENT_RECORDS_FILE)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        # Never let a cache problem fail an insert that has already been committed
+        logger.error(f"Could not invalidate recent records cache: {e}")
+    _recent_records['nonce'] = None
+
+
+def cached_recent_records():
+    """Return the buffered records if they are fresh enough to serve, otherwise None"""
+    cached = read_recent_records()
+    if cached is None:
+        return None
+
+    seeded_at, items = cached
+    if seeded_at < PROCESS_STARTED_AT or time.time() - seeded_at > RECENT_RECORDS_MAX_AGE:
+        return None
+
+    return items
+
+
+def recent_records_response(items, limit):
+    """Build the /api/records response body from pre-serialized records"""
+    body = '{"data": [' + ','.join(items[:limit]) + '], "success": true}'
+    return app.response_class(body, mimetype='application/json')
+
+
+def returned_record(cursor_vars, values):
+    """Build a cache record from an insert's bind values and RETURNING variables"""
+    entry_date = cursor_vars['new_entry_date'].getvalue()[0]
+    created_date = cursor_vars['new_created_date'].getvalue()[0]
+    return {
+        'ID': cursor_vars['new_id'].getvalue()[0],
+        'ZONE': values['zone'],
+        'FIELD_OFFICER': values['officer'],
+        'BTSID': values['btsid'],
+        'MSISDN': values['msisdn'],
+        'ENTRY_DATE': entry_date.strftime('%Y-%m-%d') if entry_date else None,
+        'NEW_SIM': values['new_sim'],
+        'REPLACE_SIM': values['replace'],
+        'NEW_RETAILER_COUNT': values['retailer_count'],
+        'CREATED_DATE': created_date.strftime('%Y-%m-%d %H:%M:%S') if created_date else None,
+    }
+
+
+def returning_vars(cursor):
+    """Create the output variables bound by INSERT_RETURNING_CLAUSE"""
+    return {
+        'new_id': cursor.var(int),
+        'new_entry_date': cursor.var(oracledb.DB_TYPE_DATE),
+        'new_created_date': cursor.var(oracledb.DB_TYPE_TIMESTAMP),
+    }
+
+
+# Bulk-upload templates with dropdown lists, cached per reference-data version.
+# reference_sites.json is written by sync_reference_data.py; a new roster gets a
+# new version, so stale templates are simply never looked up again.
+REFERENCE_SITES_FILE = 'reference_sites.json'
+TEMPLATE_CACHE_DIR = os.path.join(CACHE_DIR, 'templates')
+TEMPLATE_ROWS = 1000  # data rows covered by the dropdown validations
+
+TEMPLATE_HEADERS = ['Zone', 'Field Officer', 'BTS ID', 'MSISDN',
+                    'Date (YYYY-MM-DD)', 'New SIM', 'Replace', 'New Retailer Count']
+TEMPLATE_COLUMN_WIDTHS = [15, 20, 12, 15, 20, 10, 10, 18]
+
+# Per-worker index of reference_sites.json: file version, roster version,
+# {zone: {officer: [site ids]}} and {officer: zone}
+_reference_sites = {'file_version': None, 'version': None, 'zones': {}, 'officers': {}}
+
+# (roster version, zone, officer) -> xlsx bytes
+_template_cache = {}
+
+
+def load_reference_sites():
+    """Return the zone/officer/site index, re-reading reference_sites.json only when it changes"""
+    try:
+        stat = os.stat(REFERENCE_SITES_FILE)
+    except FileNotFoundError:
+        logger.warning(f"{REFERENCE_SITES_FILE} not found; templates will have no dropdown lists")
+        return _reference_sites
+
+    file_version = (stat.st_ino, stat.st_mtime_ns)
+    if file_version != _reference_sites['file_version']:
+        with open(REFERENCE_SITES_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        zones = {}
+        officers = {}
+        for site in data['sites']:
+            if not site['zone'] or not site['field_officer']:
+                continue
+            zones.setdefault(site['zone'], {}).setdefault(site['field_officer'], []).append(site['site_id'])
+            officers.setdefault(site['field_officer'], site['zone'])
+
+        _reference_sites.update({
+            'file_version': file_version,
+            'version': data['version'],
+            'zones': zones,
+            'officers': officers
+        })
+        logger.info(f"Loaded {len(data['sites'])} BTS sites (reference version {data['version'][:12]})")
+
+    return _reference_sites
+
+
+def build_template(zone, officer, reference_sites):
+    """Build the upload template, limiting the dropdowns to the given zone/officer"""
+    zones = reference_sites['zones']
+    if officer:
+        zone_list = [zone]
+        officer_list = [officer]
+        site_list = sorted(zones[zone][officer])
+    elif zone:
+        zone_list = [zone]
+        officer_list = sorted(zones[zone])
+        site_list = sorted(site for sites in zones[zone].values() for site in sites)
+    else:
+        zone_list = sorted(zones)
+        officer_list = sorted(reference_sites['officers'])
+        site_list = sorted(site for officers in zones.values() for sites in officers.values() for site in sites)
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Mela SIM Upload"
+    
+    # Style for headers
+    header_fill = PatternFill(start_color="7FB560", end_color="7FB560", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF", size=12)
+    header_alignment = Alignment(horizontal="center", vertical="center")
+    
+    # Write headers
+    for col_num, header in enumerate(TEMPLATE_HEADERS, 1):
+        cell = ws.cell(row=1, column=col_num)
+        cell.value = header
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = header_alignment
+    
+    # Adjust column widths
+    for i, width in enumerate(TEMPLATE_COLUMN_WIDTHS, 1):
+        ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = width
+    
+    # Dropdown sources live on a hidden sheet; bulk_upload only reads the active sheet
+    lists = wb.create_sheet("Lists")
+    lists.sheet_state = 'hidden'
+    last_row = TEMPLATE_ROWS + 1
+    
+    for col_num, (header, values) in enumerate(
+            [('Zone', zone_list), ('Field Officer', officer_list), ('BTS ID', site_list)], 1):
+        lists.cell(row=1, column=col_num).value = header
+        for row_num, value in enumerate(values, 2):
+            lists.cell(row=row_num, column=col_num).value = value
+        if not values:
+            continue
+        
+        letter = openpyxl.utils.get_column_letter(col_num)
+        validation = DataValidation(
+            type='list',
+            formula1=f"Lists!${letter}$2:${letter}${len(values) + 1}",
+            showErrorMessage=True,
+            errorTitle=f"Invalid {header}",
+            error=f"Choose a {header} from the list"
+        )
+        validation.add(f"{letter}2:{letter}{last_row}")
+        ws.add_data_validation(validation)
+    
+    yes_no = DataValidation(type='list', formula1='"YES,NO"', showErrorMessage=True,
+                            errorTitle="Invalid value", error="Choose YES or NO")
+    yes_no.add(f"F2:G{last_row}")
+    ws.add_data_validation(yes_no)
+    
+    retailer_count = DataValidation(type='whole', operator='between', formula1='0', formula2='99',
+                                    showErrorMessage=True, errorTitle="Invalid count",
+                                    error="New retailer count must be between 0 and 99")
+    retailer_count.add(f"H2:H{last_row}")
+    ws.add_data_validation(retailer_count)
+    
+    output = BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def get_template(zone, officer, reference_sites):
+    """Return template bytes from memory, then disk, building them only for a new roster version"""
+    version = reference_sites['version'] or 'none'
+    key = (version, zone, officer)
+    
+    if key in _template_cache:
+        return _template_cache[key]
+    
+    if any(cached_version != version for cached_version, _, _ in _template_cache):
+        _template_cache.clear()
+    
+    version_dir = os.path.join(TEMPLATE_CACHE_DIR, version)
+    name = hashlib.sha1(json.dumps([zone, officer]).encode('utf-8')).hexdigest()
+    path = os.path.join(version_dir, f"{name}.xlsx")
+    
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        # Not built yet, or pruned by another worker; build it here
+        data = build_template(zone, officer, reference_sites)
+        logger.info(f"Built upload template: zone={zone}, officer={officer}")
+        
+        # Drop templates built for older rosters
+        if os.path.isdir(TEMPLATE_CACHE_DIR):
+            for entry in os.listdir(TEMPLATE_CACHE_DIR):
+                if entry != version:
+                    shutil.rmtree(os.path.join(TEMPLATE_CACHE_DIR, entry), ignore_errors=True)
+        
+        # Another worker may prune this directory meanwhile; the disk copy is only an optimization
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(version_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not cache upload template on disk: {e}")
+    
+    _template_cache[key] = data
+    return data
+
+
 @app.route('/')
 def index():
     """Serve the main HTML page"""
@@ -191,9 +548,9 @@ def submit_data():
              NEW_RETAILER_COUNT, CREATED_BY)
             VALUES (:zone, :officer, :btsid, :msisdn, TO_DATE(:entry_date, 'YYYY-MM-DD'), 
                     :new_sim, :replace, :retailer_count, :created_by)
-        """
+        """ + INSERT_RETURNING_CLAUSE
         
-        cursor.execute(insert_query, {
+        values = {
             'zone': data['zone'],
             'officer': data['field_officer'],
             'btsid': data['btsid'],
@@ -203,12 +560,16 @@ def submit_data():
             'replace': data['replace'],
             'retailer_count': retailer_count,
             'created_by': data.get('created_by', 'WEB_PORTAL')
-        })
+        }
+        cursor_vars = returning_vars(cursor)
+        cursor.execute(insert_query, {**values, **cursor_vars})
         
         connection.commit()
         cursor.close()
         connection.close()
         
+        push_recent_records([returned_record(cursor_vars, values)])
+        
         logger.info(f"Record inserted successfully: MSISDN={data['msisdn']}")
         return jsonify({
             'success': True, 
@@ -229,20 +590,21 @@ def get_records():
     try:
         limit = request.args.get('limit', 5, type=int)
         
+        # Serve the usual "latest N" requests from the shared buffer
+        if 0 < limit <= RECENT_RECORDS_SIZE:
+            items = cached_recent_records()
+            if items is None:
+                connection = get_db_connection()
+                cursor = connection.cursor()
+                items = seed_recent_records(cursor)
+                cursor.close()
+                connection.close()
+            return recent_records_response(items, limit)
+        
         connection = get_db_connection()
         cursor = connection.cursor()
         
-        query = """
-            SELECT ID, ZONE, FIELD_OFFICER, BTSID, MSISDN, 
-                   TO_CHAR(ENTRY_DATE, 'YYYY-MM-DD') as ENTRY_DATE,
-                   NEW_SIM, REPLACE_SIM, NEW_RETAILER_COUNT, 
-                   TO_CHAR(CREATED_DATE, 'YYYY-MM-DD HH24:MI:SS') as CREATED_DATE
-            FROM Mela_SIM_sell_crm_cnl_T 
-            ORDER BY CREATED_DATE DESC 
-            FETCH FIRST :limit ROWS ONLY
-        """
-        
-        cursor.execute(query, {'limit': limit})
+        cursor.execute(RECENT_RECORDS_QUERY, {'limit': limit})
         
         columns = [col[0] for col in cursor.description]
         records = []
@@ -262,45 +624,32 @@ def get_records():
 
 @app.route('/api/download-template', methods=['GET'])
 def download_template():
-    """Generate and download Excel template"""
+    """Download Excel template, optionally limited to one zone and field officer"""
     try:
-        # Create a new workbook
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Mela SIM Upload"
-        
-        # Define headers with date format notation
-        headers = ['Zone', 'Field Officer', 'BTS ID', 'MSISDN', 
-                   'Date (YYYY-MM-DD)', 'New SIM', 'Replace', 'New Retailer Count']
-        
-        # Style for headers
-        header_fill = PatternFill(start_color="7FB560", end_color="7FB560", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=12)
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        
-        # Write headers
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_num)
-            cell.value = header
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = header_alignment
-        
-        # Adjust column widths
-        column_widths = [15, 20, 12, 15, 20, 10, 10, 18]
-        for i, width in enumerate(column_widths, 1):
-            ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = width
-        
-        # Save to BytesIO
-        output = BytesIO()
-        wb.save(output)
-        output.seek(0)
+        zone = request.args.get('zone', '').strip() or None
+        officer = request.args.get('officer', '').strip() or None
+        
+        # Never refuse the download: unknown names are dropped and the officer decides the zone
+        reference_sites = load_reference_sites()
+        if officer and officer not in reference_sites['officers']:
+            logger.warning(f"Template requested for unknown field officer: {officer}")
+            officer = None
+        if officer:
+            zone = reference_sites['officers'][officer]
+        elif zone and zone not in reference_sites['zones']:
+            logger.warning(f"Template requested for unknown zone: {zone}")
+            zone = None
+        
+        download_name = 'Mela_SIM_Upload_Template'
+        for part in (zone, officer):
+            if part:
+                download_name += '_' + re.sub(r'[^A-Za-z0-9]+', '_', part).strip('_')
         
         return send_file(
-            output,
+            BytesIO(get_template(zone, officer, reference_sites)),
             mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
             as_attachment=True,
-            download_name='Mela_SIM_Upload_Template.xlsx'
+            download_name=f'{download_name}.xlsx'
         )
     
     except Exception as e:
@@ -403,6 +752,7 @@ def bulk_upload():
         cursor = connection.cursor()
         
         inserted_count = 0
+        inserted_records = []
         errors = []
         
         # Skip header row (row 1)
@@ -469,9 +819,9 @@ def bulk_upload():
                      REPLACE_SIM, NEW_RETAILER_COUNT, CREATED_BY)
                     VALUES (:zone, :officer, :btsid, :msisdn, TO_DATE(:entry_date, 'YYYY-MM-DD'), 
                             :new_sim, :replace, :retailer_count, :created_by)
-                """
+                """ + INSERT_RETURNING_CLAUSE
                 
-                cursor.execute(insert_query, {
+                values = {
                     'zone': str(zone).strip(),
                     'officer': str(field_officer).strip(),
                     'btsid': str(btsid).strip(),
@@ -481,7 +831,10 @@ def bulk_upload():
                     'replace': str(replace_sim).strip().upper(),
                     'retailer_count': int(retailer_count),
                     'created_by': 'BULK_UPLOAD'
-                })
+                }
+                cursor_vars = returning_vars(cursor)
+                cursor.execute(insert_query, {**values, **cursor_vars})
+                inserted_records.append(returned_record(cursor_vars, values))
                 
                 inserted_count += 1
                 
@@ -493,6 +846,9 @@ def bulk_upload():
         cursor.close()
         connection.close()
         
+        if inserted_records:
+            push_recent_records(inserted_records)
+        
         response_data = {
             'success': True,
             'inserted': inserted_count,
@@ -0,0 +1,48 @@
+-- ===============================================================
+-- Reference Tables for Mela SIM Sell Portal
+-- Database: dwhdb02
+-- Populated by sync_reference_data.py from the roster CSV (csv.csv)
+-- ===============================================================
+
+-- S&D zones
+CREATE TABLE Mela_SIM_ref_zone_T (
+    ZONE_NAME VARCHAR2(100) PRIMARY KEY,
+    ADDL_GM VARCHAR2(200),
+    ROW_HASH VARCHAR2(40) NOT NULL,
+    UPDATED_DATE TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Field officers
+CREATE TABLE Mela_SIM_ref_officer_T (
+    OFFICER_NAME VARCHAR2(200) PRIMARY KEY,
+    ZONE_NAME VARCHAR2(100),
+    INCHARGE_NAME VARCHAR2(200),
+    ROW_HASH VARCHAR2(40) NOT NULL,
+    UPDATED_DATE TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- BTS sites
+CREATE TABLE Mela_SIM_ref_site_T (
+    SITE_ID VARCHAR2(100) PRIMARY KEY,
+    ZONE_NAME VARCHAR2(100),
+    FIELD_OFFICER VARCHAR2(200),
+    DISTRICT VARCHAR2(100),
+    DIVISION VARCHAR2(100),
+    DEALER_NAME VARCHAR2(200),
+    INCHARGE_NAME VARCHAR2(200),
+    ROW_HASH VARCHAR2(40) NOT NULL,
+    UPDATED_DATE TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create indexes for better query performance
+CREATE INDEX idx_ref_officer_zone ON Mela_SIM_ref_officer_T(ZONE_NAME);
+CREATE INDEX idx_ref_site_zone ON Mela_SIM_ref_site_T(ZONE_NAME);
+CREATE INDEX idx_ref_site_officer ON Mela_SIM_ref_site_T(FIELD_OFFICER);
+
+-- Grant permissions (adjust as needed)
+-- sync_reference_data.py connects as DB_USER (dwh_user) and runs MERGE/DELETE
+GRANT SELECT, INSERT, UPDATE, DELETE ON Mela_SIM_ref_zone_T TO dwh_user;
+GRANT SELECT, INSERT, UPDATE, DELETE ON Mela_SIM_ref_officer_T TO dwh_user;
+GRANT SELECT, INSERT, UPDATE, DELETE ON Mela_SIM_ref_site_T TO dwh_user;
+
+COMMIT;
@@ -420,7 +420,20 @@ function showMessage(text, type) {
  */
 async function downloadTemplate() {
     try {
-        const response = await fetch(`${API_BASE_URL}/download-template`);
+        // Limit the template's dropdowns to the zone/officer selected in the form
+        const params = new URLSearchParams();
+        const zone = document.getElementById('zoneSearch').value.trim();
+        const officer = document.getElementById('officerSearch').value.trim();
+        if (zonesData.includes(zone)) params.set('zone', zone);
+        if (officersData.includes(officer)) params.set('officer', officer);
+        
+        const response = await fetch(`${API_BASE_URL}/download-template?${params}`);
+        if (!response.ok) {
+            const result = await response.json();
+            showMessage(result.error || 'Failed to download template', 'error');
+            return;
+        }
+        
         const blob = await response.blob();
         const url = window.URL.createObjectURL(blob);
         const a = document.createElement('a');
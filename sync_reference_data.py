@@ -0,0 +1,262 @@
+"""
+Reference Data Sync - Sync zones, field officers and BTS sites from the roster CSV
+Streams the roster, diffs every row against the ROW_HASH already stored in the
+reference tables and applies only the changes with array-DML MERGE/DELETE.
+Also refreshes reference_data.json and reference_sites.json when the roster changes.
+
+Usage:
+    python sync_reference_data.py                 # sync csv.csv to database and JSON
+    python sync_reference_data.py --dry-run       # show what would change
+    python sync_reference_data.py --no-db         # only refresh the JSON files
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+
+from config import DB_CONFIG
+
+ROSTER_FILE = 'csv.csv'
+REFERENCE_DATA_FILE = 'reference_data.json'
+REFERENCE_SITES_FILE = 'reference_sites.json'
+
+# Reference tables: key column followed by the data columns, in bind order
+ENTITIES = {
+    'zones': {
+        'table': 'Mela_SIM_ref_zone_T',
+        'columns': ['ZONE_NAME', 'ADDL_GM'],
+    },
+    'officers': {
+        'table': 'Mela_SIM_ref_officer_T',
+        'columns': ['OFFICER_NAME', 'ZONE_NAME', 'INCHARGE_NAME'],
+    },
+    'sites': {
+        'table': 'Mela_SIM_ref_site_T',
+        'columns': ['SITE_ID', 'ZONE_NAME', 'FIELD_OFFICER', 'DISTRICT',
+                    'DIVISION', 'DEALER_NAME', 'INCHARGE_NAME'],
+    },
+}
+
+# Roster columns read by read_roster(); a renamed header would otherwise blank every row
+REQUIRED_COLUMNS = ['SITE_ID', 'S_AND_D_ZONE', 'FIELD_OFFICER_NAME', 'DISTRICT', 'DIVISION',
+                    'DEALER_NAME', 'INCHARGE_NAME', 'ADDL_GM']
+
+BATCH_SIZE = 1000
+
+
+def row_hash(values):
+    """Content hash of one reference row"""
+    return hashlib.sha1(json.dumps(values, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def read_roster(csv_file_path):
+    """Stream the roster CSV into {entity: {key: values}}"""
+    entities = {name: {} for name in ENTITIES}
+
+    # utf-8-sig: the roster export starts with a BOM
+    with open(csv_file_path, 'r', encoding='utf-8-sig', newline='') as file:
+        reader = csv.DictReader(file)
+        header = {name.strip() for name in reader.fieldnames or []}
+        missing = [col for col in REQUIRED_COLUMNS if col not in header]
+        if missing:
+            raise ValueError(f"roster is missing required columns: {', '.join(missing)}")
+
+        for row in reader:
+            row = {k.strip(): (v or '').strip() for k, v in row.items() if k}
+            site_id = row.get('SITE_ID')
+            zone = row.get('S_AND_D_ZONE')
+            officer = row.get('FIELD_OFFICER_NAME')
+            if not site_id:
+                continue
+
+            entities['sites'][site_id] = [
+                site_id, zone, officer, row.get('DISTRICT'), row.get('DIVISION'),
+                row.get('DEALER_NAME'), row.get('INCHARGE_NAME'),
+            ]
+            if zone:
+                entities['zones'].setdefault(zone, [zone, row.get('ADDL_GM')])
+            if officer:
+                entities['officers'].setdefault(officer, [officer, zone, row.get('INCHARGE_NAME')])
+
+    if not entities['sites']:
+        raise ValueError("roster contains no sites")
+
+    return entities
+
+
+def roster_version(entities):
+    """Version of the whole roster; unchanged when only row order changes"""
+    digest = hashlib.sha1()
+    for name in sorted(entities):
+        for key in sorted(entities[name]):
+            digest.update(row_hash(entities[name][key]).encode('ascii'))
+    return digest.hexdigest()
+
+
+def fetch_hashes(cursor, entity):
+    """Load {key: ROW_HASH} for one reference table"""
+    spec = ENTITIES[entity]
+    cursor.arraysize = BATCH_SIZE
+    cursor.execute(f"SELECT {spec['columns'][0]}, ROW_HASH FROM {spec['table']}")
+    return dict(cursor.fetchall())
+
+
+def diff_entity(current_hashes, rows):
+    """Return (changed rows, removed keys) for one entity"""
+    changed = []
+    for key, values in rows.items():
+        values_hash = row_hash(values)
+        if current_hashes.get(key) != values_hash:
+            changed.append(values + [values_hash])
+    removed = [[key] for key in current_hashes if key not in rows]
+    return changed, removed
+
+
+def merge_sql(entity):
+    """Build the single-row MERGE used with executemany"""
+    spec = ENTITIES[entity]
+    key, *data_columns = spec['columns']
+    columns = spec['columns'] + ['ROW_HASH']
+    source = ', '.join(f":{i + 1} AS {col}" for i, col in enumerate(columns))
+    updates = ', '.join(f"t.{col} = s.{col}" for col in data_columns + ['ROW_HASH'])
+    return f"""
+        MERGE INTO {spec['table']} t
+        USING (SELECT {source} FROM DUAL) s
+        ON (t.{key} = s.{key})
+        WHEN MATCHED THEN UPDATE SET {updates}, t.UPDATED_DATE = CURRENT_TIMESTAMP
+        WHEN NOT MATCHED THEN INSERT ({', '.join(columns)})
+            VALUES ({', '.join('s.' + col for col in columns)})
+    """
+
+
+def apply_changes(cursor, entity, changed, removed):
+    """Apply one entity's diff with array DML"""
+    spec = ENTITIES[entity]
+    sql = merge_sql(entity)
+    for start in range(0, len(changed), BATCH_SIZE):
+        cursor.executemany(sql, changed[start:start + BATCH_SIZE])
+    if removed:
+        cursor.executemany(f"DELETE FROM {spec['table']} WHERE {spec['columns'][0]} = :1", removed)
+
+
+def sync_database(entities, dry_run=False):
+    """Diff the roster against the reference tables and apply the changes"""
+    import oracledb
+
+    connection = oracledb.connect(
+        user=DB_CONFIG['user'],
+        password=DB_CONFIG['password'],
+        dsn=DB_CONFIG['dsn']
+    )
+    cursor = connection.cursor()
+
+    try:
+        diffs = {}
+        for entity in ENTITIES:
+            diffs[entity] = diff_entity(fetch_hashes(cursor, entity), entities[entity])
+            changed, removed = diffs[entity]
+            print(f"{entity}: {len(changed)} changed, {len(removed)} removed")
+
+        if not any(changed or removed for changed, removed in diffs.values()):
+            print("✓ Reference tables unchanged")
+            return
+        if dry_run:
+            print("Reference tables would be updated")
+            return
+
+        # Upserts parents first, deletes children first
+        for entity in ENTITIES:
+            apply_changes(cursor, entity, diffs[entity][0], [])
+        for entity in reversed(list(ENTITIES)):
+            apply_changes(cursor, entity, [], diffs[entity][1])
+
+        connection.commit()
+        print("✓ Reference tables updated")
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def load_json(path):
+    """Load a JSON file, or None if it does not exist"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_json_files(entities, version):
+    """Rewrite reference_data.json and reference_sites.json for the given roster"""
+    reference_data = {
+        'version': version,
+        'zones': sorted(entities['zones']),
+        'field_officers': sorted(entities['officers'])
+    }
+    site_columns = ['site_id', 'zone', 'field_officer', 'district',
+                    'division', 'dealer_name', 'incharge_name']
+    sites = [json.dumps(dict(zip(site_columns, entities['sites'][key])), ensure_ascii=False)
+             for key in sorted(entities['sites'])]
+
+    write_atomically(REFERENCE_DATA_FILE,
+                     json.dumps(reference_data, indent=2, ensure_ascii=False) + '\n')
+    # One site per line keeps the file small and its git diffs readable
+    write_atomically(REFERENCE_SITES_FILE,
+                     f'{{"version": "{version}", "sites": [\n' + ',\n'.join(sites) + '\n]}\n')
+
+
+def write_atomically(path, content):
+    """Replace a file in one step so the running app never reads it half-written"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Sync reference data from the roster CSV')
+    parser.add_argument('--csv', default=ROSTER_FILE, help='roster CSV file (default: csv.csv)')
+    parser.add_argument('--dry-run', action='store_true', help='show changes without applying them')
+    parser.add_argument('--no-db', action='store_true', help='only refresh the JSON files')
+    args = parser.parse_args()
+
+    try:
+        entities = read_roster(args.csv)
+    except FileNotFoundError:
+        print(f"CSV file not found: {args.csv}")
+        return 1
+    except ValueError as e:
+        # Refuse to sync a broken export: it would empty the tables and dropdowns
+        print(f"Invalid roster {args.csv}: {e}")
+        return 1
+
+    version = roster_version(entities)
+    print(f"Roster: {len(entities['zones'])} zones, {len(entities['officers'])} field officers, "
+          f"{len(entities['sites'])} sites (version {version[:12]})")
+
+    if not args.no_db:
+        try:
+            sync_database(entities, dry_run=args.dry_run)
+        except Exception as e:
+            print(f"Database error: {e}")
+            return 1
+
+    reference_data = load_json(REFERENCE_DATA_FILE) or {}
+    reference_sites = load_json(REFERENCE_SITES_FILE) or {}
+    if reference_data.get('version') == version and reference_sites.get('version') == version:
+        print("✓ Reference JSON files unchanged")
+    elif args.dry_run:
+        print("Reference JSON files would be rewritten")
+    else:
+        write_json_files(entities, version)
+        print(f"✓ Reference JSON files written ({REFERENCE_DATA_FILE}, {REFERENCE_SITES_FILE})")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())